@@ -1,16 +1,84 @@
 import re
 
+try:
+    # RE2 compila las expresiones a un autómata determinista y garantiza tiempo lineal
+    # en la longitud de la cadena; si no está instalado se emplea el módulo re
+    import re2 as motor_re
+except ImportError:
+    motor_re = re
+
+def compilar_exp_reg(patron : str):
+    """
+        Esta función compila una expresión regular con el motor disponible (RE2 o re). Con re se
+        emplea la bandera re.ASCII, ya que el lenguaje de prueba solo contiene caracteres ASCII
+        param patron: La expresión regular a compilar
+        return: La expresión regular compilada
+    """
+
+    if motor_re is re:
+        return re.compile(patron, re.ASCII)
+
+    return motor_re.compile(patron)
+
+# Alfabeto sobre el que se expanden las transiciones de los autómatas
+ALFABETO = tuple(chr(codigo) for codigo in range(128))
+
+# Valor de las tablas de transiciones de Descriptor que indica que no existe una transición
+SIN_TRANSICION = 0xFF
+
+# Número máximo de descripciones que conserva cada Descriptor
+MAX_DESCRIPCIONES = 4096
+
 class Clasificador:
     
-    def __init__(self, expresiones_regulares : list):
-        self.expresiones_regulares = expresiones_regulares
+    def __init__(self, expresiones_regulares : list, iniciales : list = None):
+        """
+            param expresiones_regulares: Una lista de expresiones regulares, como cadenas o ya compiladas
+            param iniciales: Opcionalmente, una lista con una cadena por expresión regular que contiene los
+            caracteres con los que puede comenzar una cadena que coincida con ella
+        """
+
+        # Las expresiones que lleguen como cadenas se compilan una sola vez aquí,
+        # en lugar de resolverlas en la caché de re por cada cadena a clasificar
+        self.expresiones_regulares = [
+            compilar_exp_reg(exp) if isinstance(exp, str) else exp
+            for exp in expresiones_regulares
+        ]
+
+        # Si se conocen los caracteres iniciales de cada expresión, el primer caracter de la cadena
+        # determina qué expresiones vale la pena evaluar, y las demás se descartan sin invocarlas
+        self.por_inicial = None
+        if iniciales is not None:
+            self.por_inicial = {}
+            for exp, caracteres in zip(self.expresiones_regulares, iniciales):
+                for caracter in caracteres:
+                    self.por_inicial.setdefault(caracter, []).append(exp)
+
+    def _clasificar(self, cadena : str):
+        """
+            Esta función obtiene la expresión regular con la que coincide una cadena
+            param cadena: Una cadena
+            return: La primera expresión regular que coincide con la cadena, o None si ninguna coincide
+        """
+
+        # Sin caracteres iniciales, o para la cadena vacía, se evalúan todas las expresiones en orden
+        if self.por_inicial is None or not cadena:
+            candidatas = self.expresiones_regulares
+        else:
+            candidatas = self.por_inicial.get(cadena[0], ())
+
+        for exp in candidatas:
+            if exp.fullmatch(cadena):
+                return exp
+
+        return None
 
     def obtener_correspondencias(self, cadenas : list):
         """
             Esta función obtiene las correspondencias de las expresiones regulares con las cadenas
             y devuelve un diccionario con las expresiones regulares como llaves y las cadenas con las que coinciden como valores,
-            y una lista con las cadenas que no coincidieron con ninguna expresión regular
-            param expresiones_regulares: Una lista de expresiones regulares
+            y una lista con las cadenas que no coincidieron con ninguna expresión regular.
+            Si una cadena coincide con más de una expresión, se asigna a la primera de la lista
             param cadenas: Una lista de cadenas
             return: Una tupla con un diccionario con las expresiones regulares como llaves y las cadenas con las que coinciden como valores,
             y una lista con las cadenas que no coincidieron con ninguna expresión regular
@@ -26,18 +94,13 @@ class Clasificador:
 
         # Para cada cadena, se verifica si coincide con alguna expresión regular
         for cadena in cadenas:
-            coincidio = False
+            exp = self._clasificar(cadena)
 
-            for exp in self.expresiones_regulares:
-
-                if re.fullmatch(exp, cadena):
-                    # Si coincide, se agrega la cadena al conjunto de correspondencias de la expresión regular
-                    correspondencias[exp].add(cadena)
-                    coincidio = True
-
-            if not coincidio:
+            if exp is not None:
+                # Si coincide, se agrega la cadena al conjunto de correspondencias de la expresión regular
+                correspondencias[exp].add(cadena)
+            else:
                 cadenas_sin_correspondencia.add(cadena)
-                
 
         # Se ordenan las cadenas de cada expresión regular
         for exp in self.expresiones_regulares:
@@ -72,6 +135,7 @@ class Descriptor:
                 {
                     "estado": [
                         {"estado_destino": "expresion_regular_que_coincide_con_el_caracter"},
+                        {"estado_destino": frozenset(códigos_de_los_caracteres_que_coinciden)},
                         ...
                     ],
                     ...
@@ -88,6 +152,7 @@ class Descriptor:
         self.nombre = nombre
         self.automata = automata
         self.descripcion_natural = []
+        self._construir_tablas()
 
     def __str__(self):
         
@@ -98,50 +163,129 @@ class Descriptor:
         # Se elimina la última coma
         return descripcion_como_cadena[:-1]
 
+    def _expandir_transiciones(self, estados_iniciales = ("q0",)):
+        """
+            Esta función expande las transiciones del autómata sobre el ALFABETO, de modo que para cada
+            estado alcanzable desde los estados iniciales se conoce el destino de cada caracter
+            param estados_iniciales: Los estados desde los que se recorre el autómata
+            return: Un diccionario con los estados alcanzables como llaves, en orden de descubrimiento,
+            y como valores una tupla con el estado destino de cada caracter del ALFABETO, o None si
+            no existe una transición con ese caracter
+        """
+
+        transiciones = self.automata["transitions"]
+        destinos = {}
+        pendientes = list(estados_iniciales)
+
+        while pendientes:
+            estado = pendientes.pop(0)
+            if estado in destinos:
+                continue
+
+            destinos_estado = []
+            for caracter in ALFABETO:
+                destino = None
+                # La primera transición que coincide con el caracter es la que se toma, igual que en describir
+                for transicion in transiciones.get(estado, []):
+                    posible_destino = next(iter(transicion.keys()))
+                    caracter_esperado = transicion[posible_destino]
+                    if isinstance(caracter_esperado, frozenset):
+                        coincide = ord(caracter) in caracter_esperado
+                    else:
+                        coincide = re.fullmatch(caracter_esperado, caracter)
+                    if coincide:
+                        destino = posible_destino
+                        break
+                destinos_estado.append(destino)
+                if destino is not None and destino not in destinos and destino not in pendientes:
+                    pendientes.append(destino)
+
+            destinos[estado] = tuple(destinos_estado)
+
+        return destinos
+
+    def _construir_tablas(self):
+        """
+            Esta función construye las tablas de transiciones que emplea describir: una tabla de 256 bytes
+            por estado, donde la posición ord(caracter) contiene el número del estado destino, o SIN_TRANSICION
+            si no existe una transición, de modo que cada caracter (o byte) se procesa con una sola consulta.
+            Las posiciones fuera del ALFABETO no tienen transición
+        """
+
+        try:
+            estados_conocidos = list(self.automata["transitions"]) + list(self.automata["endstates"])
+            destinos = self._expandir_transiciones(estados_conocidos)
+        except (KeyError, re.error) as ex:
+            raise ValueError("El formato del autómata es incorrecto") from ex
+
+        # Las descripciones previas dejan de ser válidas si cambian las tablas
+        self._descripciones = {}
+        self.estados = list(destinos)
+        self.numero_estado = {estado: numero for numero, estado in enumerate(self.estados)}
+        self.aceptacion = [estado in self.automata["endstates"] for estado in self.estados]
+
+        if len(self.estados) >= SIN_TRANSICION:
+            raise ValueError(f"El autómata tiene más de {SIN_TRANSICION - 1} estados")
+
+        tablas = []
+        for estado in self.estados:
+            tabla = bytearray([SIN_TRANSICION]) * 256
+            for codigo, destino in enumerate(destinos[estado]):
+                if destino is not None:
+                    tabla[codigo] = self.numero_estado[destino]
+            tablas.append(bytes(tabla))
+        self.tablas = tuple(tablas)
+
     def describir(self, cadena, estado_inicial = "q0"):
         """
             Esta función analiza una cadena y determina si es parte de la expresión regular que describe
             param cadena: Una cadena
-            return: True si la cadena es parte de la expresión regular que describe, False en caso contrario
+            return: Una lista con la descripción en lenguaje natural de cada paso del análisis
         """
 
+        # La descripción de una cadena depende solo de la cadena y del estado inicial,
+        # por lo que se reutiliza si ya se había calculado
+        descripcion_natural = self._descripciones.get((cadena, estado_inicial))
+        if descripcion_natural is not None:
+            self.descripcion_natural = descripcion_natural
+            return descripcion_natural
+
         descripcion_natural = []
-        encontro_transicion : bool
-        estado_actual = estado_inicial
+        encontro_transicion = True
+        tablas = self.tablas
 
         try:
-            for caracter in cadena:
+            estado_actual = self.numero_estado[estado_inicial]
+        except KeyError as ex:
+            raise ValueError(f"El estado '{estado_inicial}' no existe en el autómata") from ex
 
-                descripcion_natural.append(f"Se encontró el caracter '{caracter}' en el estado '{estado_actual}'")
+        for caracter in cadena:
 
-                for transicion in self.automata["transitions"][estado_actual]: # Se obtienen las transiciones del estado actua
-                    encontro_transicion = False
-                    posible_destino = next(iter(transicion.keys()))
-                    caracter_esperado = transicion[posible_destino]
+            descripcion_natural.append(f"Se encontró el caracter '{caracter}' en el estado '{self.estados[estado_actual]}'")
 
-                    if re.fullmatch(caracter_esperado, caracter):
-                        descripcion_natural.append(f"Existe una transición de '{estado_actual}' a '{posible_destino}' con este caracter")
-                        estado_actual = posible_destino
-                        descripcion_natural.append(f"Ahora el estado actual es '{estado_actual}'")
-                        encontro_transicion = True
-                        break
-                                
-                if not encontro_transicion:
-                    descripcion_natural.append(f"No se encontró una transición con el caracter '{caracter}' desde el estado '{estado_actual}'")
-                    break
+            codigo = ord(caracter)
+            posible_destino = tablas[estado_actual][codigo] if codigo < 256 else SIN_TRANSICION
 
-                descripcion_natural.append("------------------------")
+            if posible_destino == SIN_TRANSICION:
+                encontro_transicion = False
+                descripcion_natural.append(f"No se encontró una transición con el caracter '{caracter}' desde el estado '{self.estados[estado_actual]}'")
+                break
 
-            if estado_actual in self.automata["endstates"]:
-                descripcion_natural.append(f"El autómata finalizó en el estado '{estado_actual}', un estado de aceptación")
-                if not encontro_transicion:
-                    descripcion_natural.append(f"No obstante, no se encontró una transición para todos los caracteres de la cadena. Por lo tanto, la cadena no es válida")
-            else:
-                descripcion_natural.append(f"El autómata finalizó en el estado '{estado_actual}', un estado de no aceptación")
+            descripcion_natural.append(f"Existe una transición de '{self.estados[estado_actual]}' a '{self.estados[posible_destino]}' con este caracter")
+            estado_actual = posible_destino
+            descripcion_natural.append(f"Ahora el estado actual es '{self.estados[estado_actual]}'")
 
-            self.descripcion_natural = descripcion_natural
-            return descripcion_natural
-            
-        except Exception as ex:
-            raise Exception("El formato del autómata es incorrecto") from ex
+            descripcion_natural.append("------------------------")
+
+        if self.aceptacion[estado_actual]:
+            descripcion_natural.append(f"El autómata finalizó en el estado '{self.estados[estado_actual]}', un estado de aceptación")
+            if not encontro_transicion:
+                descripcion_natural.append(f"No obstante, no se encontró una transición para todos los caracteres de la cadena. Por lo tanto, la cadena no es válida")
+        else:
+            descripcion_natural.append(f"El autómata finalizó en el estado '{self.estados[estado_actual]}', un estado de no aceptación")
 
+        self.descripcion_natural = descripcion_natural
+        if len(self._descripciones) >= MAX_DESCRIPCIONES:
+            self._descripciones.clear()
+        self._descripciones[(cadena, estado_inicial)] = descripcion_natural
+        return descripcion_natural
@@ -10,31 +10,56 @@
     
 """
 
+import logging
 import os
+import string
 import sys
 import tkinter as tk
+from functools import partial
 from tkinter import scrolledtext
 from tkinter import filedialog
 from tkinter import messagebox
 from lector import LectorCadenas
-from analisis_cadenas import Clasificador, Descriptor
+from analisis_cadenas import Clasificador, Descriptor, compilar_exp_reg
 from PIL import ImageTk, Image
 
+# Conjuntos de códigos de caracteres que se usan como transiciones de los autómatas. Se construyen
+# una sola vez y los autómatas que aceptan los mismos caracteres comparten el mismo conjunto
+LETRAS_GUION_BAJO = frozenset(map(ord, string.ascii_letters + "_"))
+DIGITOS = frozenset(map(ord, string.digits))
+ALFANUMERICOS = frozenset(map(ord, string.ascii_letters + string.digits))
+ALFANUMERICOS_GUIONES = frozenset(map(ord, string.ascii_letters + string.digits + "-_"))
+
 class VerticalScrolledFrame(tk.Frame):
     """A pure Tkinter scrollable frame that actually works!
 
     * Use the 'interior' attribute to place widgets inside the scrollable frame
     * Construct and pack/place/grid normally
     * This frame only allows vertical scrolling
+    * Use populate_lazily to create long lists of widgets as they are scrolled into view
     """
     def __init__(self, parent, *args, **kw):
         tk.Frame.__init__(self, parent, *args, **kw)            
 
+        # items whose widgets have not been created yet, see populate_lazily
+        self._items = []
+        self._next_item = 0
+        self._create_widget = None
+        self._batch_size = 0
+
         # create a canvas object and a vertical scrollbar for scrolling it
         vscrollbar = tk.Scrollbar(self, orient=tk.VERTICAL)
         vscrollbar.pack(fill=tk.Y, side=tk.RIGHT, expand=tk.FALSE)
+
+        def _scrolled(first, last):
+            vscrollbar.set(first, last)
+            # create the next batch once the view gets close to the end of the inner frame;
+            # the new widgets resize the frame and call this again until the view is filled
+            if self._next_item < len(self._items) and float(last) >= 0.9:
+                self._create_batch()
+
         canvas = tk.Canvas(self, bd=0, highlightthickness=0,
-                        yscrollcommand=vscrollbar.set)
+                        yscrollcommand=_scrolled)
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=tk.TRUE)
         vscrollbar.config(command=canvas.yview)
 
@@ -65,6 +90,24 @@ class VerticalScrolledFrame(tk.Frame):
                 canvas.itemconfigure(interior_id, width=canvas.winfo_width())
         canvas.bind('<Configure>', _configure_canvas)
 
+    def populate_lazily(self, items, create_widget, batch_size=50):
+        """Create the widgets for items only as they are about to be shown
+
+        * create_widget(interior, item) creates and packs the widget of one item
+        * Widgets are created batch_size at a time and are kept once created
+        """
+        self._items = items
+        self._next_item = 0
+        self._create_widget = create_widget
+        self._batch_size = batch_size
+        self._create_batch()
+
+    def _create_batch(self):
+        end = min(self._next_item + self._batch_size, len(self._items))
+        for item in self._items[self._next_item:end]:
+            self._create_widget(self.interior, item)
+        self._next_item = end
+
 class App:
 
     """
@@ -95,13 +138,17 @@ class App:
         """
             Este método define las expresiones regulares que se emplearán para clasificar las cadenas de caracteres
             que se obtengan del archivo de texto.
+
+            Las expresiones se compilan una sola vez con el motor de expresiones regulares disponible
+            (RE2 si está instalado, re en otro caso). No se anclan con \\A y \\Z porque RE2 no admite
+            \\Z; el clasificador las evalúa con fullmatch, que ambos motores implementan.
         """
 
         return [
             # Identificadores
             # Un identificador debe comenzar con una letra o un guión bajo,
             # y puede contener letras, números, guiones y guiones bajos
-            r"([a-zA-Z]|_)([a-zA-Z]|[0-9]|-|_)*",
+            compilar_exp_reg(r"([a-zA-Z]|_)([a-zA-Z]|[0-9]|-|_)*"),
             # Constantes
             # Una constante numérica puede ser un número entero o un número decimal
             # Un número entero puede ser un dígito o un dígito seguido de un número entero
@@ -109,11 +156,28 @@ class App:
             # Una constante alfanumérica puede ser una cadena de caracteres entre comillas dobles
             # Una cadena de caracteres puede ser un carácter o un carácter seguido de una cadena de caracteres
             # Englobado por comillas dobles
-            r"((-)?([0-9]+)(\.[0-9]+)?)|\"([a-zA-Z]|[0-9])*\"",
+            compilar_exp_reg(r"((-)?([0-9]+)(\.[0-9]+)?)|\"([a-zA-Z]|[0-9])*\""),
             # Comentarios
             # Un comentario puede ser una línea que comienza con el numeral
             # y está seguida de cualquier carácter
-            r"#([a-zA-Z]|[0-9]|_|-)*",
+            compilar_exp_reg(r"#([a-zA-Z]|[0-9]|_|-)*"),
+        ]
+
+    def definir_iniciales(self):
+
+        """
+            Este método define, para cada expresión regular de definir_exp_reg y en el mismo orden, los
+            caracteres con los que puede comenzar una cadena que coincida con ella. El clasificador los
+            emplea para evaluar únicamente la expresión que corresponde al primer caracter de cada cadena.
+        """
+
+        return [
+            # Identificadores: una letra o un guión bajo
+            string.ascii_letters + "_",
+            # Constantes: un dígito, el signo menos o comillas dobles
+            string.digits + "-\"",
+            # Comentarios: el numeral
+            "#",
         ]
 
     def exp_como_automatas(self):
@@ -122,6 +186,10 @@ class App:
             Este método define los automatas de estado finito que describen el proceso de reconocimiento de las cadenas
             de caracteres por las expresiones regulares definidas en el método definir_exp_reg.
 
+            Las transiciones con varios caracteres se expresan con los conjuntos de códigos definidos al
+            inicio del módulo, y las de un solo caracter con una expresión regular de ese caracter. El punto
+            decimal se expresa con un conjunto, ya que "." como expresión regular coincide con cualquier caracter.
+
             Ver la clase Descriptor para más información del formato de los autómatas.
         """
 
@@ -130,10 +198,10 @@ class App:
             "transitions" :
             {
                 "q0": [
-                    {"q1": "[a-zA-Z]|_"},
+                    {"q1": LETRAS_GUION_BAJO},
                 ],
                 "q1": [
-                    {"q1": "([a-zA-Z]|[0-9]|-|_)"},
+                    {"q1": ALFANUMERICOS_GUIONES},
                 ],
             },
             # Estados de aceptación
@@ -149,28 +217,28 @@ class App:
             {
                 "q0": [
                     {"q1": "-"},
-                    {"q2": "[0-9]"},
+                    {"q2": DIGITOS},
                     {"q5" : "\""},
                     ],
                 "q1": [
-                    {"q2": "[0-9]"},
+                    {"q2": DIGITOS},
                 ],
                 "q2": [
-                    {"q2": "[0-9]"},
-                    {"q3": "."},
+                    {"q2": DIGITOS},
+                    {"q3": frozenset({ord(".")})},
                 ],
                 "q3": [
-                    {"q4": "[0-9]"},
+                    {"q4": DIGITOS},
                 ],
                 "q4": [
-                    {"q4": "[0-9]"},
+                    {"q4": DIGITOS},
                 ],
                 "q5": [
-                    {"q6": "([a-zA-Z]|[0-9])"},
+                    {"q6": ALFANUMERICOS},
                     {"q7": "\""},
                 ],
                 "q6": [
-                    {"q6": "([a-zA-Z]|[0-9])"},
+                    {"q6": ALFANUMERICOS},
                     {"q7": "\""},
                 ], 
             },
@@ -190,7 +258,7 @@ class App:
                     {"q1": "#"},
                 ],
                 "q1": [
-                    {"q1": "([a-zA-Z]|[0-9]|_|-)"},
+                    {"q1": ALFANUMERICOS_GUIONES},
                 ],
             },
             # Estados de aceptación
@@ -217,7 +285,8 @@ class App:
             param maxlineas: Número máximo de líneas a mostrar por cada descriptor en una ventana emergente
         """
 
-        analisis = ""
+        # Las líneas de cada ventana emergente se acumulan en una lista y se unen al mostrarla
+        analisis = []
 
         try:
             for descriptor in descriptores:
@@ -231,35 +300,77 @@ class App:
                     lineas_a_mostrar = maxlineas
 
                 for estatuto in lista_estatutos:
-                    analisis += estatuto + "\n"
+                    analisis.append(estatuto)
                     contador_lineas += 1
                     contador_lineas_total += 1
 
                     if lineas_a_mostrar == contador_lineas or contador_lineas_total == len(lista_estatutos):
 
+                        estatus_lineas = ""
                         if len(lista_estatutos) > maxlineas:
                             estatus_lineas = f"(Mostrando líneas {contador_lineas_total - maxlineas + 1 if contador_lineas_total < len(lista_estatutos) else contador_lineas_total - contador_lineas + 1}"
                             estatus_lineas += f" a {contador_lineas_total if contador_lineas_total < len(lista_estatutos) else len(lista_estatutos)}"
                             estatus_lineas += f", de {len(lista_estatutos)})\n"
-                            analisis = estatus_lineas + analisis
 
-                        messagebox.showinfo(f"Análisis de la cadena {cadena} como {descriptor.nombre}", analisis)
-                        analisis = ""
+                        messagebox.showinfo(f"Análisis de la cadena {cadena} como {descriptor.nombre}", estatus_lineas + "\n".join(analisis))
+                        analisis.clear()
                         contador_lineas = 0
 
-        except:
+        except ValueError:
+            # Descriptor.describir informa con ValueError que el estado inicial no existe en el autómata
+            logging.exception("No se pudo analizar la cadena %r", cadena)
             messagebox.showerror("Error", "No se pudo analizar la cadena, el formato del automata no es correcto")
 
-    def crear_funcion(self, cadena, descriptores : list[Descriptor]):
+    def cargar_imagenes(self):
 
         """
-            Este método permite extraer la función de describir_analisis de la clase Analizador
-            para poder utilizarla como parámetro de un botón de manera adecuada.
-            param cadena: Cadena de caracteres a analizar
+            Este método lee las imágenes del diagrama de Moore de cada autómata. Como no cambian entre
+            un archivo y otro, se leen una sola vez y se conservan en la instancia, lo que además evita
+            que el recolector de basura las libere mientras se muestran.
+        """
+
+        img_identificadores = Image.open(self.resource_path("./imagenes/autom_identificadores.png"))
+        self._img_identificadores = ImageTk.PhotoImage(img_identificadores.resize((300, 230)))
+
+        img_constantes = Image.open(self.resource_path("./imagenes/autom_constantes.png"))
+        self._img_constantes = ImageTk.PhotoImage(img_constantes.resize((300, 240)))
+
+        img_comentarios = Image.open(self.resource_path("./imagenes/autom_comentarios.png"))
+        self._img_comentarios = ImageTk.PhotoImage(img_comentarios.resize((300, 240)))
+
+    def crear_boton(self, descriptores : list[Descriptor], ancho : int, contenedor, cadena : str):
+
+        """
+            Este método crea y coloca en el contenedor el botón que solicita la descripción del análisis de una cadena
             param descriptores: Lista de objetos Descriptor que describen el proceso de reconocimiento de la cadena
+            param ancho: Ancho del botón
+            param contenedor: Widget en el que se coloca el botón
+            param cadena: Cadena de caracteres que analiza el botón
+        """
+
+        tk.Button(
+            contenedor,
+            text=cadena,
+            command = partial(self.describir_analisis, cadena, descriptores),
+            width = ancho
+        ).pack()
+
+    def crear_contenido(self):
+
+        """
+            Este método crea el contenedor que ocupa la ventana principal debajo del botón para leer archivos,
+            y en el que se colocan las imágenes y las listas de botones. Al leer otro archivo basta con destruir
+            este contenedor para retirar todos los widgets del archivo anterior.
         """
 
-        return lambda: self.describir_analisis(cadena, descriptores)
+        self._contenido = tk.Frame(self.ventana_principal)
+        self._contenido.grid(row=1, column=0, columnspan=4, rowspan=2, sticky="nsew")
+        self._contenido.columnconfigure(0, weight=1)
+        self._contenido.columnconfigure(1, weight=1)
+        self._contenido.columnconfigure(2, weight=1)
+        self._contenido.columnconfigure(3, weight=1)
+        self._contenido.rowconfigure(0, weight=2) # Fila de las imágenes
+        self._contenido.rowconfigure(1, weight=3) # Fila de los botones
 
     def construir_interfaz(self, correspondencias : dict, cadenas_sin_correspondencia : list):
 
@@ -269,104 +380,68 @@ class App:
                                     y cadenas de caracteres que las describen como valores
             param cadenas_sin_correspondencia: Lista de cadenas de caracteres que no tienen correspondencia con ninguna expresión regular del diccionario
         """
-        # Limpia la ventana principal
-        global ventana_principal
-        for widget in ventana_principal.winfo_children():
-                widget.destroy()
-
-        global boton
-        boton = tk.Button(
-            ventana_principal,
-            text = "Leer archivo",
-            command = self.leer_archivo_leng_prueba,
-            height = 10
-        )
-        boton.grid(column=1, row=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        # Limpia la ventana principal, destruyendo de una vez el contenedor con los widgets del archivo anterior
+        self._contenido.destroy()
+        self.crear_contenido()
+        contenido = self._contenido
 
-        # Se leen las imagenes correspondientes al diagrama de Moore de cada automata
+        # Se muestran las imagenes correspondientes al diagrama de Moore de cada automata
         # y una etiqueta para las cadenas que no tienen correspondencia
-        img_identificadores = Image.open(self.resource_path("./imagenes/autom_identificadores.png"))
-        img_identificadores = ImageTk.PhotoImage(img_identificadores.resize((300, 230)))
-        lbl_iden = tk.Label(ventana_principal, image=img_identificadores)
-        lbl_iden.image = img_identificadores
-        lbl_iden.grid(row=1, column=0)
+        tk.Label(contenido, image=self._img_identificadores).grid(row=0, column=0)
+        tk.Label(contenido, image=self._img_constantes).grid(row=0, column=1)
+        tk.Label(contenido, image=self._img_comentarios).grid(row=0, column=2)
 
-        img_constantes = Image.open(self.resource_path("./imagenes/autom_constantes.png"))
-        img_constantes = ImageTk.PhotoImage(img_constantes.resize((300, 240)))
-        lbl_const = tk.Label(ventana_principal, image=img_constantes)
-        lbl_const.image = img_constantes
-        lbl_const.grid(row=1, column=1)
-
-        img_comentarios = Image.open(self.resource_path("./imagenes/autom_comentarios.png"))
-        img_comentarios = ImageTk.PhotoImage(img_comentarios.resize((300, 240)))
-        lbl_com = tk.Label(ventana_principal, image=img_comentarios)
-        lbl_com.image = img_comentarios
-        lbl_com.grid(row=1, column=2)
-
-        tk.Label(ventana_principal, text="Elementos no clasificados").grid(row=1, column=3)
+        tk.Label(contenido, text="Elementos no clasificados").grid(row=0, column=3)
 
         # Se crean los frames para los botones de cada automata
-        frame_identificadores = VerticalScrolledFrame(ventana_principal)
-        frame_identificadores.grid(row=2, column=0)
-        frame_constantes = VerticalScrolledFrame(ventana_principal)
-        frame_constantes.grid(row=2, column=1)
-        frame_comentarios = VerticalScrolledFrame(ventana_principal)
-        frame_comentarios.grid(row=2, column=2)
-        frame_sin_correspondencia = VerticalScrolledFrame(ventana_principal)
-        frame_sin_correspondencia.grid(row=2, column=3)
+        frame_identificadores = VerticalScrolledFrame(contenido)
+        frame_identificadores.grid(row=1, column=0)
+        frame_constantes = VerticalScrolledFrame(contenido)
+        frame_constantes.grid(row=1, column=1)
+        frame_comentarios = VerticalScrolledFrame(contenido)
+        frame_comentarios.grid(row=1, column=2)
+        frame_sin_correspondencia = VerticalScrolledFrame(contenido)
+        frame_sin_correspondencia.grid(row=1, column=3)
 
         # Se crean los botones para solicitar la descripción del análisis de cada cadena que corresponde a
         # cada automata, se les asigna un ancho con base en la cadena más larga reconocida en todo el
-        # archivo de entrada, y se colocan en el frame correspondiente.
+        # archivo de entrada, y se colocan en el frame correspondiente. Los botones se crean conforme
+        # se desplaza cada lista, para no crear de una vez uno por cada cadena de un archivo grande.
 
-        exp_reg = clasificador.expresiones_regulares
-        todas_las_cadenas = correspondencias[exp_reg[0]] + correspondencias[exp_reg[1]] + correspondencias[exp_reg[2]]
-        ancho_boton = max( [len(cadena) for cadena in todas_las_cadenas])
+        exp_reg = self.clasificador.expresiones_regulares
+        ancho_boton = max(
+            (len(cadena) for exp in exp_reg[:3] for cadena in correspondencias[exp]),
+            default = 0
+        )
 
         # Correspondencias para identificadores
-        global descriptor_identificadores
-        for cadena in correspondencias[exp_reg[0]]:
-            tk.Button(
-                frame_identificadores.interior,
-                text=cadena,
-                command = self.crear_funcion(cadena, [descriptor_identificadores]),
-                width = ancho_boton
-            ).pack()
+        frame_identificadores.populate_lazily(
+            correspondencias[exp_reg[0]],
+            partial(self.crear_boton, [self.descriptor_identificadores], ancho_boton)
+        )
 
         # Correspondencias para constantes
-        global descriptor_constantes
-        for cadena in correspondencias[exp_reg[1]]:
-            boton = tk.Button(
-                frame_constantes.interior,
-                text=cadena,
-                command = self.crear_funcion(cadena, [descriptor_constantes]),
-                width = ancho_boton
-            )
-            boton.pack()
+        frame_constantes.populate_lazily(
+            correspondencias[exp_reg[1]],
+            partial(self.crear_boton, [self.descriptor_constantes], ancho_boton)
+        )
 
         # Correspondencias para comentarios
-        global descriptor_comentarios
-        for cadena in correspondencias[exp_reg[2]]:
-            tk.Button(
-                frame_comentarios.interior,
-                text=cadena,
-                command = self.crear_funcion(cadena, [descriptor_comentarios]),
-                width = ancho_boton
-            ).pack()
+        frame_comentarios.populate_lazily(
+            correspondencias[exp_reg[2]],
+            partial(self.crear_boton, [self.descriptor_comentarios], ancho_boton)
+        )
 
         # Cadenas sin correspondencia
-        for cadena in cadenas_sin_correspondencia:
-            tk.Button(
-                frame_sin_correspondencia.interior,
-                text=cadena,
-                command =
-                    self.crear_funcion(cadena, [
-                        descriptor_identificadores,
-                        descriptor_constantes,
-                        descriptor_comentarios,
-                    ]),
-                width = ancho_boton
-            ).pack()
+        todos_los_descriptores = [
+            self.descriptor_identificadores,
+            self.descriptor_constantes,
+            self.descriptor_comentarios,
+        ]
+        frame_sin_correspondencia.populate_lazily(
+            cadenas_sin_correspondencia,
+            partial(self.crear_boton, todos_los_descriptores, ancho_boton)
+        )
 
     def leer_archivo_leng_prueba(self):
 
@@ -381,17 +456,16 @@ class App:
         """
 
         try:
-            global lector
-            cadenas = lector.seleccionar_leer_archivo()
-            global boton
-            boton.configure(text="Leer otro archivo")
-        except:
+            cadenas = self.lector.seleccionar_leer_archivo()
+            self.boton.configure(text="Leer otro archivo")
+        except (OSError, ValueError):
+            # OSError si no se pudo abrir el archivo, ValueError (UnicodeDecodeError) si no está en UTF-8
+            logging.exception("No se pudo leer el archivo")
             messagebox.showerror("Error", "No se pudo leer el archivo")
             return
 
         if cadenas:
-            global clasificador
-            correspondencias = clasificador.obtener_correspondencias(cadenas)
+            correspondencias = self.clasificador.obtener_correspondencias(cadenas)
             self.construir_interfaz(correspondencias[0], correspondencias[1])
 
     def main(self):
@@ -401,41 +475,42 @@ class App:
             con el lenguaje de prueba y la construcción de otros widgets necesarios para la aplicación.
         """
 
-        global lector
-        lector = LectorCadenas()
-        global clasificador
-        clasificador = Clasificador(expresiones_regulares = self.definir_exp_reg())
+        self.lector = LectorCadenas()
+        self.clasificador = Clasificador(
+            expresiones_regulares = self.definir_exp_reg(),
+            iniciales = self.definir_iniciales()
+        )
         automatas = self.exp_como_automatas()
 
-        global descriptor_identificadores
-        descriptor_identificadores = Descriptor("identificador", automatas["identificadores"])
-        global descriptor_constantes
-        descriptor_constantes = Descriptor("constante", automatas["constantes"])
-        global descriptor_comentarios
-        descriptor_comentarios = Descriptor("comentario", automatas["comentarios"])
-
-        global ventana_principal
-        ventana_principal = tk.Tk()
-        ventana_principal.title("Clasificador de componentes léxicos para lenguaje de prueba")
-        ventana_principal.geometry("1200x600")
-        ventana_principal.resizable(True, True)
-        ventana_principal.columnconfigure(0, weight=1)
-        ventana_principal.columnconfigure(1, weight=1)
-        ventana_principal.columnconfigure(2, weight=1)
-        ventana_principal.columnconfigure(3, weight=1)
-        ventana_principal.rowconfigure(0, weight=1, pad=10) # fila del botón
-        ventana_principal.rowconfigure(1, weight=2) # Fila de las imágenes
-        ventana_principal.rowconfigure(2, weight=3) # Fila de los botones
-
-        global boton
-        boton = tk.Button(
-            ventana_principal,
+        self.descriptor_identificadores = Descriptor("identificador", automatas["identificadores"])
+        self.descriptor_constantes = Descriptor("constante", automatas["constantes"])
+        self.descriptor_comentarios = Descriptor("comentario", automatas["comentarios"])
+
+        self.ventana_principal = tk.Tk()
+        self.ventana_principal.title("Clasificador de componentes léxicos para lenguaje de prueba")
+        self.ventana_principal.geometry("1200x600")
+        self.ventana_principal.resizable(True, True)
+        self.ventana_principal.columnconfigure(0, weight=1)
+        self.ventana_principal.columnconfigure(1, weight=1)
+        self.ventana_principal.columnconfigure(2, weight=1)
+        self.ventana_principal.columnconfigure(3, weight=1)
+        self.ventana_principal.rowconfigure(0, weight=1, pad=10) # fila del botón
+        self.ventana_principal.rowconfigure(1, weight=2) # Fila de las imágenes
+        self.ventana_principal.rowconfigure(2, weight=3) # Fila de los botones
+
+        # Las imágenes requieren que exista la ventana principal
+        self.cargar_imagenes()
+
+        self.boton = tk.Button(
+            self.ventana_principal,
             text = "Leer archivo",
             command = self.leer_archivo_leng_prueba,
             height = 10
         )
-        boton.grid(column=1, row=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        self.boton.grid(column=1, row=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+
+        self.crear_contenido()
 
-        ventana_principal.mainloop()
+        self.ventana_principal.mainloop()
 
 App().main()
\ No newline at end of file
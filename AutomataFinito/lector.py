@@ -1,6 +1,5 @@
-import io
 import os
-import re
+from pathlib import Path
 from tkinter import filedialog
 
 class LectorCadenas:
@@ -31,18 +30,21 @@ class LectorCadenas:
         except Exception as ex:
             raise ex
 
-    def _leer_archivo_(self, ruta_archivo : str, separador : str = r"\s+"):
+    def _leer_archivo_(self, ruta_archivo : str, separador : str = None):
         """
             Esta función lee el archivo y devuelve las líneas del archivo como una lista
             param ruta_archivo: El archivo a leer
+            param separador: La cadena que separa las cadenas del archivo, o None para separarlas
+            por cualquier secuencia de espacios en blanco
             return: Una lista con las líneas del archivo o None si no se pudo leer el archivo,
             o una excepción si no se pudo leer el archivo
         """
 
         try:
 
-            texto_archivo = io.open(ruta_archivo, mode="r", encoding="utf-8").read() # leer archivo como UTF-8
-            lineas = re.split(r"\s+", texto_archivo)
+            texto_archivo = Path(ruta_archivo).read_text(encoding="utf-8") # leer archivo como UTF-8
+            # str.split sin separador no produce cadenas vacías al inicio o al final del texto
+            lineas = texto_archivo.split(separador)
             
             return lineas
 